@@ -11,6 +11,10 @@ if not exist "%TRIPOSR_DIR%\gradio_app.py" (
   exit /b 1
 )
 
+:: Put the project dir first on PYTHONPATH so the local torchmcubes.py wrapper is used
+:: (setup_env.bat does not build the native torchmcubes when the wrapper exists)
+set "PYTHONPATH=%PROJECT_DIR%;%PYTHONPATH%"
+
 pushd "%TRIPOSR_DIR%"
 python3 gradio_app.py
 set EXITCODE=%ERRORLEVEL%
@@ -1,12 +1,19 @@
+import bisect
+import concurrent.futures
+import hashlib
 import json
-import math
 import os
+import queue
+import re
+import shutil
+import stat
 import subprocess
 import sys
 import threading
 from pathlib import Path
+from typing import NamedTuple, Optional
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 
 # 簡易 TripoSR GUI 工具
 # - 只選擇來源圖片資料夾或單一圖片
@@ -14,8 +21,11 @@ from tkinter import filedialog, messagebox
 # - 按一下按鈕後呼叫 vendor/TripoSR/run.py 執行推論
 
 PROJECT_DIR = Path(__file__).resolve().parent
+_PROJECT_DIR_STR = str(PROJECT_DIR)
 TRIPOSR_RUN = PROJECT_DIR / "vendor" / "TripoSR" / "run.py"
 PREF_PATH = PROJECT_DIR / "mem.sav"
+# 每次執行都相同的命令列開頭，於載入模組時先組好
+_CMD_PREFIX = (sys.executable, str(TRIPOSR_RUN))
 
 # 以 2 的指數控制範圍，方便後續統一管理滑桿與 clamp 邏輯
 MC_RES = [6, 9]      # 對應 mc-resolution 最小/最大值（2^6~2^9）
@@ -27,8 +37,69 @@ DEFAULT_MC_RES = 2 ** MC_RES[1]
 DEFAULT_CHUNK_SIZE = 2 ** CH_SIZE[0]  # chunk 預設偏保守，避免一開始過度吃記憶體
 DEFAULT_TEXTURE_RES = 2 ** 10         # 1024，介於 TX_RES 範圍中間
 
+# 預設值對應的指數，預設值皆為 2 的次方，直接由位元長度求得
+_DEF_MC_EXP = DEFAULT_MC_RES.bit_length() - 1
+_DEF_CHUNK_EXP = DEFAULT_CHUNK_SIZE.bit_length() - 1
+_DEF_TEX_EXP = DEFAULT_TEXTURE_RES.bit_length() - 1
+
+# 依顯示記憶體總量（bytes，含上界）決定執行時的參數上限：(chunk-size, mc-resolution, texture-resolution)
+# 以 bisect 在上界清單中查出所屬級距；超過 8GB 則不設上限
+_NO_CAP = sys.maxsize
+_VRAM_TIERS = (
+    (0, (4096, 256, 1024)),             # 未偵測到 GPU
+    (4 * 1024 ** 3, (4096, 256, 2048)),  # 約 4GB 以下
+    (8 * 1024 ** 3, (8192, 512, _NO_CAP)),
+    (_NO_CAP, (_NO_CAP, _NO_CAP, _NO_CAP)),
+)
+_VRAM_TIER_BOUNDS = [bound for bound, _ in _VRAM_TIERS]
+
+# TripoSR 日誌中的關鍵步驟訊息，以單一預先編譯的正規表示式一次比對
+_STATUS_RE = re.compile(
+    r"(?P<proc>Processing images \.\.\.)"
+    r"|(?P<run>Running image.*\.\.\.)"
+    r"|(?P<model>Running model \.\.\.)"
+    r"|(?P<mesh>Extracting mesh \.\.\.)"
+    r"|(?P<bake>Baking texture \.\.\.)"
+    r"|(?P<expd>Exporting mesh and texture finished)"
+    r"|(?P<exp>Exporting mesh and texture \.\.\.)"
+)
+# 群組名稱 -> 轉送給 status_callback 的文字；None 表示直接轉送整行
+_STATUS_MESSAGES = {
+    "proc": "Processing images ...",
+    "run": "Running image 1/1 ...",
+    "model": "Running model ...",
+    "mesh": "Extracting mesh ...",
+    "bake": "Baking texture ...",
+    "expd": None,
+    "exp": "Exporting mesh and texture ...",
+}
+
+
+# 顯示記憶體總量只需偵測一次，之後直接沿用
+_VRAM_CACHE: Optional[int] = None
+
+
+def _query_vram_by_nvidia_smi() -> Optional[int]:
+    """透過 nvidia-smi 查詢第 0 張 GPU 的顯示記憶體（bytes），無法取得時回傳 None。"""
+    exe = shutil.which("nvidia-smi")
+    if exe is None:
+        return None
+    try:
+        result = subprocess.run(
+            [exe, "--query-gpu=memory.total", "--format=csv,noheader,nounits", "-i", "0"],
+            capture_output=True,
+            text=True,
+            timeout=2,
+        )
+        if result.returncode != 0:
+            return None
+        # 輸出單位為 MiB
+        return int(result.stdout.strip().splitlines()[0]) * 1024 ** 2
+    except Exception:
+        return None
 
-def _detect_total_vram() -> int:
+
+def _query_vram_by_torch() -> int:
     try:
         import torch
 
@@ -43,17 +114,87 @@ def _detect_total_vram() -> int:
         return 0
 
 
+def _detect_total_vram() -> int:
+    """取得顯示記憶體總量（bytes），0 表示未偵測到 GPU。
+
+    優先使用輕量的 nvidia-smi 查詢，失敗時才匯入 torch，以免 GUI 啟動時負擔 torch 的載入成本。
+    """
+    global _VRAM_CACHE
+    if _VRAM_CACHE is None:
+        vram = _query_vram_by_nvidia_smi()
+        _VRAM_CACHE = vram if vram is not None else _query_vram_by_torch()
+    return _VRAM_CACHE
+
+
+def _exp_of_pow2(v: int, lo: int, hi: int, default_exp: int) -> int:
+    """將實際值換算為最接近的 2 的指數並限制在 [lo, hi]，v <= 0 時回傳 default_exp。"""
+    if v <= 0:
+        return default_exp
+    e = v.bit_length() - 1
+    # 以整數比較取代 round(log2(v))：v >= 2^(e+0.5) 時進位到 e+1
+    if v * v >= 1 << (2 * e + 1):
+        e += 1
+    return lo if e < lo else hi if e > hi else e
+
+
+# 可送給 TripoSR 的影像副檔名（小寫、不含點）
+_IMAGE_EXTS = frozenset({"png", "jpg", "jpeg", "webp", "bmp"})
+
+
+def _is_image_name(name: str) -> bool:
+    # 與 Path.suffix 相同：檔名需有主檔名，".png" 這類點檔不算副檔名
+    stem, _, ext = name.rpartition(".")
+    return bool(stem) and ext.lower() in _IMAGE_EXTS
+
+
 def _collect_images(input_path: Path) -> list[str]:
     """收集要送給 TripoSR 的影像路徑清單。"""
-    if input_path.is_file():
-        return [str(input_path)]
-    if input_path.is_dir():
-        exts = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
-        files = [str(p) for p in sorted(input_path.iterdir()) if p.suffix.lower() in exts]
+    # 只做一次 stat，再依檔案類型分支
+    try:
+        mode = os.stat(input_path).st_mode
+    except OSError:
+        return []
+    if stat.S_ISREG(mode):
+        return [os.fspath(input_path)]
+    if stat.S_ISDIR(mode):
+        # os.scandir 的 DirEntry 會快取檔名與檔案類型，避免逐一建立 Path 物件與額外的 stat 呼叫
+        with os.scandir(input_path) as it:
+            files = [e.path for e in it if _is_image_name(e.name) and e.is_file()]
+        # 不分大小寫排序，讓各作業系統上的處理順序（即輸出資料夾索引）一致
+        files.sort(key=str.casefold)
         return files
     return []
 
 
+# GUI 輪詢背景狀態文字的間隔（毫秒）
+_STATUS_POLL_MS = 50
+
+# 子行程輸出的讀取區塊大小，與 Popen 的緩衝區大小一致
+_READ_CHUNK = 65536
+
+# Windows 下不為子行程另外開啟主控台視窗（其他平台無此旗標，為 0）
+_POPEN_FLAGS = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+def _pump(stream, lines: "queue.Queue[str]") -> None:
+    """在背景執行緒中以大區塊讀取子行程輸出，切成行後放入佇列（不含換行字元）。"""
+    buffer = b""
+    try:
+        # read1 每次最多只做一次系統呼叫，有多少資料就回傳多少，不會等到填滿整個區塊
+        while chunk := stream.read1(_READ_CHUNK):
+            buffer += chunk
+            # 與 text 模式相同，\r 也視為換行，讓 tqdm 進度列的每次更新各自成行
+            parts = buffer.splitlines()
+            buffer = b"" if buffer.endswith((b"\n", b"\r")) else parts.pop()
+            for part in parts:
+                if part:
+                    lines.put(part.decode("utf-8", "replace"))
+        if buffer:
+            lines.put(buffer.decode("utf-8", "replace"))
+    finally:
+        stream.close()
+
+
 def run_triposr(
     input_path: str,
     output_dir: str,
@@ -64,10 +205,13 @@ def run_triposr(
     preview_mode: str,
     render_flag: bool,
     status_callback=None,
+    proc_callback=None,
 ) -> int:
     """呼叫 TripoSR 的 CLI 腳本執行推論。
 
-    若提供 status_callback，會在偵測到特定日誌訊息時呼叫它，以便更新 GUI 狀態。
+    若提供 status_callback，會在偵測到特定日誌訊息時呼叫它，以便更新 GUI 狀態；
+    未提供時子行程的輸出會被丟棄，只回傳結束代碼。
+    若提供 proc_callback，子行程啟動後會以其 Popen 物件呼叫，供呼叫端在需要時終止子行程。
     """
     if not TRIPOSR_RUN.is_file():
         messagebox.showerror("Error", f"TripoSR run.py not found: {TRIPOSR_RUN}")
@@ -78,9 +222,16 @@ def run_triposr(
         messagebox.showerror("Error", "來源路徑中沒有找到可用的圖片檔案。")
         return 1
 
+    # 資料夾輸入時以該資料夾為子行程的工作目錄並只傳相對檔名，命令列約可縮短為 1/3，
+    # 提高可一次處理的影像數；數千張影像時仍可能超過 Windows 約 32K 字元的上限
+    cwd = None
+    if len(images) > 1:
+        cwd = os.path.dirname(images[0])
+        images = [os.path.join(os.curdir, os.path.basename(p)) for p in images]
+        output_dir = os.path.abspath(output_dir)
+
     cmd = [
-        sys.executable,
-        str(TRIPOSR_RUN),
+        *_CMD_PREFIX,
         *images,
         "--output-dir", output_dir,
         "--mc-resolution", str(mc_resolution),
@@ -104,57 +255,158 @@ def run_triposr(
     if render_flag:
         cmd.append("--render")
 
-    # 若有提供狀態回呼，串流讀取 stdout 並轉發關鍵狀態文字
     env = os.environ.copy()
-    # 將專案目錄加入 PYTHONPATH 最前端，確保優先載入本地的 torchmcubes.py wrapper
-    env["PYTHONPATH"] = str(PROJECT_DIR) + os.pathsep + env.get("PYTHONPATH", "")
-    
+    # 將專案目錄加入 PYTHONPATH 最前端，確保優先載入本地的 torchmcubes.py wrapper。
+    # 不可留下空白項目：Python 會把它展開成工作目錄（即影像資料夾），讓其中的 .py 被優先匯入
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (_PROJECT_DIR_STR, env.get("PYTHONPATH"))))
+
+    # 若有提供狀態回呼，串流讀取 stdout 並轉發關鍵狀態文字
     if status_callback is not None:
         proc = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
+            bufsize=_READ_CHUNK,
             env=env,
+            cwd=cwd,
+            creationflags=_POPEN_FLAGS,
         )
+        if proc_callback is not None:
+            proc_callback(proc)
         if proc.stdout is not None:
-            for raw_line in proc.stdout:
+            # 由獨立執行緒持續把 stdout 排空到佇列，避免子行程因管線緩衝區填滿而卡住
+            lines: "queue.Queue[str]" = queue.Queue()
+            reader = threading.Thread(target=_pump, args=(proc.stdout, lines), daemon=True)
+            reader.start()
+
+            # 以讀取執行緒是否結束（讀到 EOF）為準，確保子行程結束前後的最後幾行都不會遺漏
+            while reader.is_alive() or not lines.empty():
+                try:
+                    raw_line = lines.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+
                 # 先將原始輸出直接印到終端機，方便偵錯與查看完整錯誤訊息
-                print(raw_line, end="")
-
-                line = raw_line.strip()
-                if "Processing images ..." in line:
-                    status_callback("Processing images ...")
-                elif "Running image" in line and "..." in line:
-                    status_callback("Running image 1/1 ...")
-                elif "Running model ..." in line:
-                    status_callback("Running model ...")
-                elif "Extracting mesh ..." in line:
-                    status_callback("Extracting mesh ...")
-                elif "Baking texture ..." in line:
-                    status_callback("Baking texture ...")
-                elif "Exporting mesh and texture finished" in line:
-                    status_callback(line)
-                elif "Exporting mesh and texture ..." in line:
-                    status_callback("Exporting mesh and texture ...")
+                print(raw_line)
+
+                m = _STATUS_RE.search(raw_line)
+                if m is not None:
+                    # 「匯出完成」需保留原始整行（含耗時資訊），其餘轉為固定的狀態文字
+                    status_callback(_STATUS_MESSAGES[m.lastgroup] or raw_line.strip())
         return proc.wait()
 
-    # 未提供回呼時維持原本行為
-    env = os.environ.copy()
-    env["PYTHONPATH"] = str(PROJECT_DIR) + os.pathsep + env.get("PYTHONPATH", "")
-    proc = subprocess.Popen(cmd, env=env)
+    # 未提供回呼時不需要日誌，直接丟棄輸出（tqdm 偵測到非終端機時也會減少進度列更新）
+    proc = subprocess.Popen(
+        cmd,
+        env=env,
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        creationflags=_POPEN_FLAGS,
+    )
+    if proc_callback is not None:
+        proc_callback(proc)
     return proc.wait()
 
 
+class RunParams(NamedTuple):
+    """一次執行所需的解析度與資源相關參數。"""
+
+    mc_resolution: int
+    chunk_size: int
+    texture_resolution: int
+    render: bool
+    safe_mode: bool
+
+
+# 綜合負載上限：以 mc-resolution 128、chunk-size 512、texture-resolution 512 為基準組合，容許 4 倍
+_SAFE_LOAD_PRODUCT = 128 * 512 * 512 * 4
+
+# _resolve_params 回傳的警告代碼，由 GUI 對應為確認對話框
+_WARN_VRAM_ADJUSTED = "vram_adjusted"
+_WARN_HIGH_LOAD = "high_load"
+
+# 警告代碼 -> (標題, 說明, 詢問, 取消時的狀態文字)
+_WARNING_DIALOGS = {
+    _WARN_VRAM_ADJUSTED: (
+        "參數已自動調整",
+        "偵測到可用顯示記憶體較低，系統已自動將解析度與切塊大小下修為較安全的數值，\n\n",
+        "是否仍要以這些設定繼續執行？",
+        "已取消：使用者中止本次執行。",
+    ),
+    _WARN_HIGH_LOAD: (
+        "高風險設定警告",
+        "目前的 mc-resolution、chunk-size、texture-resolution 組合推估 GPU 負載遠高於建議值，\n"
+        "有可能導致系統長時間無回應或當機。\n\n",
+        "建議先下修參數後再執行。是否仍要強制繼續？",
+        "已取消：偵測到高風險設定，使用者中止本次執行。",
+    ),
+}
+
+
+def _resolve_params(raw: RunParams, total_vram: int) -> tuple[RunParams, list[str]]:
+    """依安全模式與顯示記憶體換算實際生效的參數，並回傳需要使用者確認的警告代碼。
+
+    純數值邏輯，不存取 Tk 變數也不顯示對話框，可供 GUI 以外的流程共用。
+    """
+    mc_res = raw.mc_resolution
+    chunk_size = raw.chunk_size
+    texture_res = raw.texture_resolution
+    render_flag = raw.render
+    warnings: list[str] = []
+
+    # 若啟用低記憶體安全模式，先將參數壓到更保守的範圍，並關閉 render
+    if raw.safe_mode:
+        # 這組參數偏向避免資源尖峰，而非追求速度與品質
+        mc_res = min(mc_res, 96)
+        chunk_size = min(chunk_size, 128)
+        texture_res = min(texture_res, 512)
+        render_flag = False
+
+    cs_cap, mc_cap, tex_cap = _VRAM_TIERS[bisect.bisect_left(_VRAM_TIER_BOUNDS, total_vram)][1]
+    new_params = (min(chunk_size, cs_cap), min(mc_res, mc_cap), min(texture_res, tex_cap))
+    if new_params != (chunk_size, mc_res, texture_res):
+        warnings.append(_WARN_VRAM_ADJUSTED)
+    chunk_size, mc_res, texture_res = new_params
+
+    # 綜合負載檢查：避免三個高值相乘導致 GPU 過載
+    # 三個參數的乘積超過安全基準組合的一定倍數就提示高風險（整數比較，無需浮點除法）
+    if mc_res * max(chunk_size, 1) * max(texture_res, 512) > _SAFE_LOAD_PRODUCT:
+        warnings.append(_WARN_HIGH_LOAD)
+
+    return RunParams(mc_res, chunk_size, texture_res, render_flag, raw.safe_mode), warnings
+
+
+# mem.sav 的快取：記錄上次讀寫時的檔案修改時間、解析結果與內容雜湊，
+# 檔案未變動時直接沿用，避免重複解析或寫入相同內容
+_PREF_CACHE: dict = {"mtime": None, "data": None, "hash": None}
+
+
+def _pref_sig(payload: bytes) -> bytes:
+    """mem.sav 內容的簽章，用來判斷是否需要重寫。"""
+    return hashlib.blake2b(payload, digest_size=8).digest()
+
+
+def _pref_mtime() -> Optional[int]:
+    try:
+        return PREF_PATH.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
 def _load_prefs() -> dict:
     """載入上次使用的參數設定。"""
-    if not PREF_PATH.is_file():
+    mtime = _pref_mtime()
+    if mtime is None:
         return {}
+    if mtime == _PREF_CACHE["mtime"] and _PREF_CACHE["data"] is not None:
+        return dict(_PREF_CACHE["data"])
     try:
-        data = json.loads(PREF_PATH.read_text(encoding="utf-8"))
+        raw = PREF_PATH.read_bytes()
+        data = json.loads(raw.decode("utf-8"))
         if isinstance(data, dict):
-            return data
+            _PREF_CACHE.update(mtime=mtime, data=data, hash=_pref_sig(raw))
+            return dict(data)
     except Exception:
         pass
     return {}
@@ -183,8 +435,18 @@ def _save_prefs(
         "render": render_flag,
         "safe_mode": safe_mode,
     }
+    # mem.sav 只供程式讀取，使用不縮排的緊湊格式
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    h = _pref_sig(payload)
+    # 內容與上次讀寫相同且檔案未被外部修改時，略過寫入
+    if h == _PREF_CACHE["hash"] and _pref_mtime() == _PREF_CACHE["mtime"]:
+        return
     try:
-        PREF_PATH.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        # 先寫到暫存檔再以 os.replace 原子性地取代，避免中途中斷留下寫了一半的 mem.sav
+        tmp_path = PREF_PATH.with_name(PREF_PATH.name + ".tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, PREF_PATH)
+        _PREF_CACHE.update(mtime=_pref_mtime(), data=data, hash=h)
     except Exception:
         # 儲存偏好失敗不影響主流程
         pass
@@ -207,13 +469,13 @@ class SimpleGUI(tk.Tk):
         # 低記憶體安全模式：啟用時會強制採用保守參數組合
         self.safe_mode_var = tk.BooleanVar(value=False)
         # mc-resolution 以 2 的指數形式控制：exp in [MC_RES[0], MC_RES[1]]
-        self.mc_exp_var = tk.IntVar(value=int(math.log2(DEFAULT_MC_RES)))
+        self.mc_exp_var = tk.IntVar(value=_DEF_MC_EXP)
         self.mc_res_var = tk.IntVar(value=DEFAULT_MC_RES)
         # chunk-size 以 2 的指數形式控制：exp in [CH_SIZE[0], CH_SIZE[1]]
-        self.chunk_exp_var = tk.IntVar(value=int(math.log2(DEFAULT_CHUNK_SIZE)))
+        self.chunk_exp_var = tk.IntVar(value=_DEF_CHUNK_EXP)
         self.chunk_size_var = tk.IntVar(value=DEFAULT_CHUNK_SIZE)
         # texture-resolution 以 2 的指數形式控制：exp in [TX_RES[0], TX_RES[1]]
-        self.tex_exp_var = tk.IntVar(value=int(math.log2(DEFAULT_TEXTURE_RES)))
+        self.tex_exp_var = tk.IntVar(value=_DEF_TEX_EXP)
         self.texture_res_var = tk.IntVar(value=DEFAULT_TEXTURE_RES)
 
         # 嘗試載入上次的設定
@@ -228,42 +490,33 @@ class SimpleGUI(tk.Tk):
             try:
                 loaded_mc = int(prefs.get("mc_resolution", DEFAULT_MC_RES))
                 self.mc_res_var.set(loaded_mc)
-                if loaded_mc > 0:
-                    mc_exp = int(round(math.log2(loaded_mc)))
-                    mc_exp = max(MC_RES[0], min(MC_RES[1], mc_exp))
-                    self.mc_exp_var.set(mc_exp)
-                else:
-                    self.mc_exp_var.set(int(math.log2(DEFAULT_MC_RES)))
+                self.mc_exp_var.set(
+                    _exp_of_pow2(loaded_mc, MC_RES[0], MC_RES[1], _DEF_MC_EXP)
+                )
             except Exception:
                 self.mc_res_var.set(DEFAULT_MC_RES)
-                self.mc_exp_var.set(int(math.log2(DEFAULT_MC_RES)))
+                self.mc_exp_var.set(_DEF_MC_EXP)
         if "chunk_size" in prefs:
             try:
                 loaded_chunk = int(prefs.get("chunk_size", DEFAULT_CHUNK_SIZE))
                 self.chunk_size_var.set(loaded_chunk)
                 # 嘗試從實際值反推回指數，限制在 CH_SIZE 範圍內
-                if loaded_chunk > 0:
-                    exp = int(round(math.log2(loaded_chunk)))
-                    exp = max(CH_SIZE[0], min(CH_SIZE[1], exp))
-                    self.chunk_exp_var.set(exp)
-                else:
-                    self.chunk_exp_var.set(int(math.log2(DEFAULT_CHUNK_SIZE)))
+                self.chunk_exp_var.set(
+                    _exp_of_pow2(loaded_chunk, CH_SIZE[0], CH_SIZE[1], _DEF_CHUNK_EXP)
+                )
             except Exception:
                 self.chunk_size_var.set(DEFAULT_CHUNK_SIZE)
-                self.chunk_exp_var.set(int(math.log2(DEFAULT_CHUNK_SIZE)))
+                self.chunk_exp_var.set(_DEF_CHUNK_EXP)
         if "texture_resolution" in prefs:
             try:
                 loaded_tex = int(prefs.get("texture_resolution", DEFAULT_TEXTURE_RES))
                 self.texture_res_var.set(loaded_tex)
-                if loaded_tex > 0:
-                    tex_exp = int(round(math.log2(loaded_tex)))
-                    tex_exp = max(TX_RES[0], min(TX_RES[1], tex_exp))
-                    self.tex_exp_var.set(tex_exp)
-                else:
-                    self.tex_exp_var.set(int(math.log2(DEFAULT_TEXTURE_RES)))
+                self.tex_exp_var.set(
+                    _exp_of_pow2(loaded_tex, TX_RES[0], TX_RES[1], _DEF_TEX_EXP)
+                )
             except Exception:
                 self.texture_res_var.set(DEFAULT_TEXTURE_RES)
-                self.tex_exp_var.set(int(math.log2(DEFAULT_TEXTURE_RES)))
+                self.tex_exp_var.set(_DEF_TEX_EXP)
         if "preview_delete" in prefs:
             try:
                 self.preview_delete_var.set(bool(prefs.get("preview_delete", False)))
@@ -281,78 +534,87 @@ class SimpleGUI(tk.Tk):
                 self.safe_mode_var.set(False)
 
         # 來源路徑
-        tk.Label(self, text="來源路徑 (圖片或資料夾)：").grid(row=0, column=0, sticky="w", padx=10, pady=5)
-        tk.Entry(self, textvariable=self.input_var, width=50).grid(row=0, column=1, padx=5, pady=5)
-        tk.Button(self, text="瀏覽...", command=self.browse_input).grid(row=0, column=2, padx=5, pady=5)
+        ttk.Label(self, text="來源路徑 (圖片或資料夾)：").grid(row=0, column=0, sticky="w", padx=10, pady=5)
+        ttk.Entry(self, textvariable=self.input_var, width=50).grid(row=0, column=1, padx=5, pady=5)
+        ttk.Button(self, text="瀏覽...", command=self.browse_input).grid(row=0, column=2, padx=5, pady=5)
 
         # 輸出路徑
-        tk.Label(self, text="輸出資料夾：").grid(row=1, column=0, sticky="w", padx=10, pady=5)
-        tk.Entry(self, textvariable=self.output_var, width=50).grid(row=1, column=1, padx=5, pady=5)
-        tk.Button(self, text="瀏覽...", command=self.browse_output).grid(row=1, column=2, padx=5, pady=5)
+        ttk.Label(self, text="輸出資料夾：").grid(row=1, column=0, sticky="w", padx=10, pady=5)
+        ttk.Entry(self, textvariable=self.output_var, width=50).grid(row=1, column=1, padx=5, pady=5)
+        ttk.Button(self, text="瀏覽...", command=self.browse_output).grid(row=1, column=2, padx=5, pady=5)
 
         # 網格解析度 (mc-resolution)，使用 2 的指數滑桿控制實際值
-        tk.Label(self, text="網格解析度 (mc-resolution)：").grid(row=2, column=0, sticky="w", padx=10, pady=5)
+        ttk.Label(self, text="網格解析度 (mc-resolution)：").grid(row=2, column=0, sticky="w", padx=10, pady=5)
         self.mc_display_var = tk.StringVar()
-        self.mc_scale = tk.Scale(
+        self._on_mc_exp_changed = self._make_exp_cb(
+            MC_RES[0], MC_RES[1], _DEF_MC_EXP,
+            self.mc_exp_var, self.mc_res_var, self.mc_display_var,
+        )
+        self.mc_scale = ttk.Scale(
             self,
             from_=MC_RES[0],
             to=MC_RES[1],
             orient=tk.HORIZONTAL,
-            resolution=1,
             length=260,
             variable=self.mc_exp_var,
             command=self._on_mc_exp_changed,
         )
         self.mc_scale.grid(row=2, column=1, sticky="w", padx=5, pady=5)
-        tk.Label(self, textvariable=self.mc_display_var).grid(
+        ttk.Label(self, textvariable=self.mc_display_var).grid(
             row=2, column=2, sticky="w", padx=5, pady=5
         )
 
         # 運算切塊大小 (chunk-size)，使用 2 的指數滑桿控制實際值
-        tk.Label(self, text="運算切塊 (chunk-size)：越小越省記憶體但較慢").grid(
+        ttk.Label(self, text="運算切塊 (chunk-size)：越小越省記憶體但較慢").grid(
             row=3, column=0, sticky="w", padx=10, pady=5
         )
         self.chunk_display_var = tk.StringVar()
-        self.chunk_scale = tk.Scale(
+        self._on_chunk_exp_changed = self._make_exp_cb(
+            CH_SIZE[0], CH_SIZE[1], _DEF_CHUNK_EXP,
+            self.chunk_exp_var, self.chunk_size_var, self.chunk_display_var,
+        )
+        self.chunk_scale = ttk.Scale(
             self,
             from_=CH_SIZE[0],
             to=CH_SIZE[1],
             orient=tk.HORIZONTAL,
-            resolution=1,
             length=260,
             variable=self.chunk_exp_var,
             command=self._on_chunk_exp_changed,
         )
         self.chunk_scale.grid(row=3, column=1, sticky="w", padx=5, pady=5)
-        tk.Label(self, textvariable=self.chunk_display_var).grid(
+        ttk.Label(self, textvariable=self.chunk_display_var).grid(
             row=3, column=2, sticky="w", padx=5, pady=5
         )
 
         # 貼圖解析度 (texture-resolution)，使用 2 的指數滑桿控制實際值
-        tk.Label(self, text="貼圖解析度 (texture-resolution)：越小越省記憶體").grid(
+        ttk.Label(self, text="貼圖解析度 (texture-resolution)：越小越省記憶體").grid(
             row=4, column=0, sticky="w", padx=10, pady=5
         )
         self.tex_display_var = tk.StringVar()
-        self.tex_scale = tk.Scale(
+        self._on_tex_exp_changed = self._make_exp_cb(
+            TX_RES[0], TX_RES[1], _DEF_TEX_EXP,
+            self.tex_exp_var, self.texture_res_var, self.tex_display_var,
+        )
+        self.tex_scale = ttk.Scale(
             self,
             from_=TX_RES[0],
             to=TX_RES[1],
             orient=tk.HORIZONTAL,
-            resolution=1,
             length=260,
             variable=self.tex_exp_var,
             command=self._on_tex_exp_changed,
         )
         self.tex_scale.grid(row=4, column=1, sticky="w", padx=5, pady=5)
-        tk.Label(self, textvariable=self.tex_display_var).grid(
+        ttk.Label(self, textvariable=self.tex_display_var).grid(
             row=4, column=2, sticky="w", padx=5, pady=5
         )
 
         # 是否烘焙貼圖與預覽圖刪除控制，包在同一個水平置中 Frame 中
-        options_frame = tk.Frame(self)
+        options_frame = ttk.Frame(self)
         options_frame.grid(row=5, column=0, columnspan=3, pady=5)
 
-        tk.Checkbutton(
+        ttk.Checkbutton(
             options_frame,
             text="烘焙貼圖 (bake texture)",
             variable=self.bake_texture_var,
@@ -360,7 +622,7 @@ class SimpleGUI(tk.Tk):
             offvalue=False,
         ).pack(side="left", padx=10)
 
-        tk.Checkbutton(
+        ttk.Checkbutton(
             options_frame,
             text="處理完成後自動刪除預覽圖",
             variable=self.preview_delete_var,
@@ -368,7 +630,7 @@ class SimpleGUI(tk.Tk):
             offvalue=False,
         ).pack(side="left", padx=10)
 
-        tk.Checkbutton(
+        ttk.Checkbutton(
             options_frame,
             text="輸出預覽渲染與影片 (--render)",
             variable=self.render_var,
@@ -376,7 +638,7 @@ class SimpleGUI(tk.Tk):
             offvalue=False,
         ).pack(side="left", padx=10)
 
-        tk.Checkbutton(
+        ttk.Checkbutton(
             options_frame,
             text="低記憶體安全模式",
             variable=self.safe_mode_var,
@@ -385,11 +647,11 @@ class SimpleGUI(tk.Tk):
         ).pack(side="left", padx=10)
 
         # 狀態顯示與執行按鈕，包在同一個水平置中 Frame 中
-        actions_frame = tk.Frame(self)
+        actions_frame = ttk.Frame(self)
         actions_frame.grid(row=6, column=0, columnspan=3, pady=15)
 
-        tk.Label(actions_frame, textvariable=self.status_var).pack(side="left", padx=10)
-        tk.Button(actions_frame, text="開始生成", command=self.on_run, width=20).pack(side="left", padx=10)
+        ttk.Label(actions_frame, textvariable=self.status_var).pack(side="left", padx=10)
+        ttk.Button(actions_frame, text="開始生成", command=self.on_run, width=20).pack(side="left", padx=10)
 
         # 初始化一次指數滑桿顯示文字
         self._on_mc_exp_changed(str(self.mc_exp_var.get()))
@@ -398,71 +660,106 @@ class SimpleGUI(tk.Tk):
 
         self._auto_adjust_scales_by_vram()
 
-    def _on_mc_exp_changed(self, value: str) -> None:
-        """當 mc-resolution 的指數滑桿變動時，同步更新實際值與顯示文字。"""
-        try:
-            exp = int(float(value))
-        except ValueError:
-            exp = int(math.log2(DEFAULT_MC_RES))
-        exp = max(MC_RES[0], min(MC_RES[1], exp))
-        actual = 1 << exp
-        self.mc_res_var.set(actual)
-        self.mc_display_var.set(f"{actual} (2^{exp})")
-
-    def _on_chunk_exp_changed(self, value: str) -> None:
-        """當 chunk-size 的指數滑桿變動時，同步更新實際值與顯示文字。"""
-        try:
-            exp = int(float(value))
-        except ValueError:
-            exp = int(math.log2(DEFAULT_CHUNK_SIZE))
-        exp = max(CH_SIZE[0], min(CH_SIZE[1], exp))
-        actual = 1 << exp
-        self.chunk_size_var.set(actual)
-        self.chunk_display_var.set(f"{actual} (2^{exp})")
-
-    def _on_tex_exp_changed(self, value: str) -> None:
-        """當 texture-resolution 的指數滑桿變動時，同步更新實際值與顯示文字。"""
-        try:
-            exp = int(float(value))
-        except ValueError:
-            exp = int(math.log2(DEFAULT_TEXTURE_RES))
-        exp = max(TX_RES[0], min(TX_RES[1], exp))
-        actual = 1 << exp
-        self.texture_res_var.set(actual)
-        self.tex_display_var.set(f"{actual} (2^{exp})")
+        # 單一背景工作執行緒，跨多次執行重複使用；關閉視窗時一併結束
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="triposr")
+        # 目前執行中的 TripoSR 子行程，關閉視窗時用來終止它
+        self._proc_lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._closing = False
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        # 背景執行緒回報的最新狀態文字，由 _poll_status 以固定頻率套用到 UI
+        self._status_lock = threading.Lock()
+        self._pending_status: Optional[str] = None
+        self._poll_status()
+
+        # 預先收集可切換 state 的互動元件（含兩個 Frame 內的勾選框與執行按鈕），
+        # 之後停用/啟用 UI 時直接走訪此 tuple，不必每次查詢子元件與其選項
+        stateful_types = (ttk.Button, ttk.Entry, ttk.Scale, ttk.Checkbutton)
+        self._stateful = tuple(
+            w
+            for parent in (self, options_frame, actions_frame)
+            for w in parent.winfo_children()
+            if isinstance(w, stateful_types)
+        )
+
+    def _make_exp_cb(self, lo: int, hi: int, default_exp: int, exp_var, actual_var, display_var):
+        """建立指數滑桿的回呼：滑桿變動時同步更新實際值與顯示文字。
+
+        範圍與預設指數在建立時即綁定為預設參數，拖曳滑桿時不必再查詢模組層級常數。
+        """
+
+        def cb(value: str, lo=lo, hi=hi, d=default_exp, ev=exp_var, av=actual_var, dv=display_var) -> None:
+            try:
+                e = round(float(value))
+            except ValueError:
+                e = d
+            if e < lo:
+                e = lo
+            elif e > hi:
+                e = hi
+            # ttk.Scale 沒有 resolution 選項，拖曳時會產生小數，在此對齊到整數指數
+            ev.set(e)
+            a = 1 << e
+            av.set(a)
+            dv.set(f"{a} (2^{e})")
+
+        return cb
 
     def _auto_adjust_scales_by_vram(self) -> None:
         total_vram = _detect_total_vram()
 
         if total_vram <= 0:
             # 未偵測到 GPU 或查詢失敗，視為低資源環境
-            new_mc_max = min(int(self.mc_scale["to"]), 8)
-            new_chunk_max = min(int(self.chunk_scale["to"]), 11)
-            new_tex_max = min(int(self.tex_scale["to"]), 10)
+            caps = (8, 11, 10)
         elif total_vram <= 4 * 1024 ** 3:
             # 約 4GB 顯存：略微放寬貼圖，但仍限制網格與切塊
-            new_mc_max = min(int(self.mc_scale["to"]), 8)
-            new_chunk_max = min(int(self.chunk_scale["to"]), 11)
-            new_tex_max = min(int(self.tex_scale["to"]), 11)
+            caps = (8, 11, 11)
         else:
             # 大於 4GB 顯存一律視為中高階，但仍採較保守上限，避免隨意拉滿
-            new_mc_max = min(int(self.mc_scale["to"]), 9)
-            new_chunk_max = min(int(self.chunk_scale["to"]), 12)
-            new_tex_max = min(int(self.tex_scale["to"]), 12)
-
-        self.mc_scale.config(to=new_mc_max)
-        self.chunk_scale.config(to=new_chunk_max)
-        self.tex_scale.config(to=new_tex_max)
-
-        if self.mc_exp_var.get() > new_mc_max:
-            self.mc_exp_var.set(new_mc_max)
-            self._on_mc_exp_changed(str(new_mc_max))
-        if self.chunk_exp_var.get() > new_chunk_max:
-            self.chunk_exp_var.set(new_chunk_max)
-            self._on_chunk_exp_changed(str(new_chunk_max))
-        if self.tex_exp_var.get() > new_tex_max:
-            self.tex_exp_var.set(new_tex_max)
-            self._on_tex_exp_changed(str(new_tex_max))
+            caps = (9, 12, 12)
+
+        # 上限未變的滑桿不重設，超出上限的指數才回呼更新顯示
+        sliders = (
+            (self.mc_scale, self.mc_exp_var, self._on_mc_exp_changed),
+            (self.chunk_scale, self.chunk_exp_var, self._on_chunk_exp_changed),
+            (self.tex_scale, self.tex_exp_var, self._on_tex_exp_changed),
+        )
+        for (scale, exp_var, on_changed), cap in zip(sliders, caps):
+            old_max = int(self.getdouble(scale["to"]))
+            new_max = min(old_max, cap)
+            if new_max != old_max:
+                scale.config(to=new_max)
+            if exp_var.get() > new_max:
+                exp_var.set(new_max)
+                on_changed(str(new_max))
+
+    def _track_proc(self, proc: subprocess.Popen) -> None:
+        """記錄執行中的 TripoSR 子行程；若視窗已在啟動前關閉，立即終止它。"""
+        with self._proc_lock:
+            self._proc = proc
+            closing = self._closing
+        if closing:
+            proc.terminate()
+
+    def _on_close(self) -> None:
+        # cancel_futures 只會取消尚未開始的工作；執行中的子行程需自行終止，
+        # 否則視窗關閉後背景執行緒仍會讓程序存活到 TripoSR 跑完
+        with self._proc_lock:
+            self._closing = True
+            proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
+
+    def _poll_status(self) -> None:
+        """定時套用背景執行緒回報的最新狀態，每秒最多更新 UI 約 20 次。"""
+        with self._status_lock:
+            text, self._pending_status = self._pending_status, None
+        if text is not None:
+            self.status_var.set(text)
+        self.after(_STATUS_POLL_MS, self._poll_status)
 
     def browse_input(self) -> None:
         # 允許選擇單一圖片或整個資料夾
@@ -493,103 +790,46 @@ class SimpleGUI(tk.Tk):
 
         # 從滑桿與輸入取得解析度與資源相關參數
         # 這三個變數已由指數滑桿回呼函式換算為實際值
-        mc_res = int(self.mc_res_var.get())
+        raw = RunParams(
+            mc_resolution=int(self.mc_res_var.get()),
+            chunk_size=int(self.chunk_size_var.get()),
+            texture_resolution=int(self.texture_res_var.get()),
+            render=bool(self.render_var.get()),
+            safe_mode=bool(self.safe_mode_var.get()),
+        )
         bake_tex = bool(self.bake_texture_var.get())
-        chunk_size = int(self.chunk_size_var.get())
-        texture_res = int(self.texture_res_var.get())
         preview_delete = bool(self.preview_delete_var.get())
-        render_flag = bool(self.render_var.get())
-        safe_mode = bool(self.safe_mode_var.get())
 
         # 單一勾選：未勾選時保持原行為 (keep)，勾選時改為 delete
         preview_mode = "delete" if preview_delete else "keep"
 
-        # 若啟用低記憶體安全模式，先將參數壓到更保守的範圍，並關閉 render
-        if safe_mode:
-            # 這組參數偏向避免資源尖峰，而非追求速度與品質
-            mc_res = min(mc_res, 96)
-            chunk_size = min(chunk_size, 128)
-            texture_res = min(texture_res, 512)
-            render_flag = False
-            # 回寫到變數與 UI，以便使用者看到實際生效值
-            self.mc_res_var.set(mc_res)
-            self.chunk_size_var.set(chunk_size)
-            self.texture_res_var.set(texture_res)
-            self.render_var.set(False)
-
-        total_vram = _detect_total_vram()
-        adjusted = False
+        params, warnings = _resolve_params(raw, _detect_total_vram())
+        mc_res = params.mc_resolution
+        chunk_size = params.chunk_size
+        texture_res = params.texture_resolution
+        render_flag = params.render
+        safe_mode = params.safe_mode
 
-        if total_vram <= 0:
-            if chunk_size > 4096:
-                chunk_size = 4096
-                adjusted = True
-            if mc_res > 256:
-                mc_res = 256
-                adjusted = True
-            if texture_res > 1024:
-                texture_res = 1024
-                adjusted = True
-        elif total_vram <= 4 * 1024 ** 3:
-            if chunk_size > 4096:
-                chunk_size = 4096
-                adjusted = True
-            if mc_res > 256:
-                mc_res = 256
-                adjusted = True
-            if texture_res > 2048:
-                texture_res = 2048
-                adjusted = True
-        elif total_vram <= 8 * 1024 ** 3:
-            if chunk_size > 8192:
-                chunk_size = 8192
-                adjusted = True
-            if mc_res > 512:
-                mc_res = 512
-                adjusted = True
-
-        if adjusted:
+        if params != raw:
+            # 回寫到變數與 UI，以便使用者看到實際生效值
             self.mc_res_var.set(mc_res)
             self.chunk_size_var.set(chunk_size)
             self.texture_res_var.set(texture_res)
+            self.render_var.set(render_flag)
 
+        for warning in warnings:
+            title, intro, question, cancel_status = _WARNING_DIALOGS[warning]
             confirm = messagebox.askyesno(
-                "參數已自動調整",
-                "偵測到可用顯示記憶體較低，系統已自動將解析度與切塊大小下修為較安全的數值，\n\n"
-                f"mc-resolution: {mc_res}\n"
+                title,
+                intro
+                + f"mc-resolution: {mc_res}\n"
                 f"chunk-size: {chunk_size}\n"
                 f"texture-resolution: {texture_res}\n\n"
-                "是否仍要以這些設定繼續執行？",
+                + question,
             )
             if not confirm:
                 # 使用者選擇取消這次執行，直接中止流程
-                self.status_var.set("已取消：使用者中止本次執行。")
-                return
-
-        # 綜合負載檢查：避免三個高值相乘導致 GPU 過載
-        # 以較安全的基準組合做相對倍率估算，超過一定倍數就提示高風險
-        base_mc = 128
-        base_chunk = 512
-        base_tex = 512
-
-        load_score = (
-            (mc_res / base_mc)
-            * (max(chunk_size, 1) / base_chunk)
-            * (max(texture_res, base_tex) / base_tex)
-        )
-
-        if load_score > 4.0:
-            high_risk = messagebox.askyesno(
-                "高風險設定警告",
-                "目前的 mc-resolution、chunk-size、texture-resolution 組合推估 GPU 負載遠高於建議值，\n"
-                "有可能導致系統長時間無回應或當機。\n\n"
-                f"mc-resolution: {mc_res}\n"
-                f"chunk-size: {chunk_size}\n"
-                f"texture-resolution: {texture_res}\n\n"
-                "建議先下修參數後再執行。是否仍要強制繼續？",
-            )
-            if not high_risk:
-                self.status_var.set("已取消：偵測到高風險設定，使用者中止本次執行。")
+                self.status_var.set(cancel_status)
                 return
 
         # 在開始執行前就先儲存目前設定，避免後續卡住時遺失輸入
@@ -611,10 +851,9 @@ class SimpleGUI(tk.Tk):
         else:
             self.status_var.set("執行中：可能正在前處理、推論或 mesh 抽取...")
 
+        # 實際執行在背景工作執行緒中進行，這裡直接送出即可，不必再延遲排程
         self.disable_ui()
-        self.after(
-            100,
-            self._run_triposr_async,
+        self._run_triposr_async(
             input_path,
             output_dir,
             mc_res,
@@ -636,11 +875,11 @@ class SimpleGUI(tk.Tk):
         preview_mode: str,
         render_flag: bool,
     ) -> None:
-        """在背景執行緒中呼叫 TripoSR，避免卡住主執行緒。"""
+        """在背景工作執行緒中呼叫 TripoSR，避免卡住主執行緒。"""
 
-        def worker() -> None:
+        def worker() -> int:
             def status_cb(msg: str) -> None:
-                # 依照日誌訊息轉換為較易懂的步驟說明，並排回主執行緒更新
+                # 依照日誌訊息轉換為較易懂的步驟說明，交由主執行緒更新
                 text = msg
                 print(msg)
                 if msg.startswith("Processing images"):
@@ -658,9 +897,11 @@ class SimpleGUI(tk.Tk):
                 elif msg.startswith("Exporting mesh and texture"):
                     text = "Step 6 正在匯出 mesh 與貼圖..."
 
-                self.after(0, lambda: self.status_var.set(text))
+                # 只覆寫待更新槽位，由主執行緒定時取出，避免每行日誌都排一個 after 回呼
+                with self._status_lock:
+                    self._pending_status = text
 
-            rc = run_triposr(
+            return run_triposr(
                 input_path,
                 output_dir,
                 mc_resolution,
@@ -670,66 +911,72 @@ class SimpleGUI(tk.Tk):
                 preview_mode,
                 render_flag,
                 status_callback=status_cb,
+                proc_callback=self._track_proc,
             )
 
-            def on_done() -> None:
-                if rc == 0:
-                    # 若使用者選擇刪除預覽圖，於本地輸出資料夾中清理 input.png
-                    if preview_mode == "delete":
-                        try:
-                            out_root = Path(output_dir)
-                            # 單一影像輸出路徑下可能直接有 input.png
-                            single_preview = out_root / "input.png"
-                            if single_preview.is_file():
+        def on_done(fut: "concurrent.futures.Future[int]") -> None:
+            # 丟棄尚未套用的步驟狀態，避免稍後覆蓋最終結果
+            with self._status_lock:
+                self._pending_status = None
+            exc = fut.exception()
+            if exc is not None:
+                # 背景執行緒發生未預期例外時視為失敗，確保 UI 能恢復可操作
+                print(f"[ERROR] TripoSR worker failed: {exc!r}")
+            rc = 1 if exc is not None else fut.result()
+            if rc == 0:
+                # 若使用者選擇刪除預覽圖，於本地輸出資料夾中清理 input.png
+                if preview_mode == "delete":
+                    try:
+                        out_root = Path(output_dir)
+                        # 單一影像輸出路徑下可能直接有 input.png
+                        single_preview = out_root / "input.png"
+                        if single_preview.is_file():
+                            try:
+                                single_preview.unlink()
+                            except OSError:
+                                pass
+
+                        # 多張影像時，TripoSR 會在 output_dir/索引 底下寫入 input.png
+                        for sub in out_root.iterdir():
+                            if not sub.is_dir():
+                                continue
+                            p = sub / "input.png"
+                            if p.is_file():
                                 try:
-                                    single_preview.unlink()
+                                    p.unlink()
                                 except OSError:
-                                    pass
-
-                            # 多張影像時，TripoSR 會在 output_dir/索引 底下寫入 input.png
-                            for sub in out_root.iterdir():
-                                if not sub.is_dir():
+                                    # 刪除失敗不影響主流程
                                     continue
-                                p = sub / "input.png"
-                                if p.is_file():
-                                    try:
-                                        p.unlink()
-                                    except OSError:
-                                        # 刪除失敗不影響主流程
-                                        continue
-                        except Exception:
-                            # 任何刪除錯誤皆不影響主流程
-                            pass
-
-                    self.status_var.set("完成：TripoSR 處理完成。")
-                    messagebox.showinfo("完成", "TripoSR 處理完成。")
-                else:
-                    self.status_var.set(f"發生錯誤：代碼 {rc}")
-                    messagebox.showerror("錯誤", f"TripoSR 執行失敗，代碼: {rc}")
-                self.enable_ui()
-
-            # 將 UI 更新排回主執行緒
-            self.after(0, on_done)
-
-        threading.Thread(target=worker, daemon=True).start()
+                    except Exception:
+                        # 任何刪除錯誤皆不影響主流程
+                        pass
+
+                self.status_var.set("完成：TripoSR 處理完成。")
+                messagebox.showinfo("完成", "TripoSR 處理完成。")
+            else:
+                self.status_var.set(f"發生錯誤：代碼 {rc}")
+                messagebox.showerror("錯誤", f"TripoSR 執行失敗，代碼: {rc}")
+            self.enable_ui()
+
+        def post_done(fut: "concurrent.futures.Future[int]") -> None:
+            # 完成回呼會在背景執行緒中觸發，將 UI 更新排回主執行緒；視窗已關閉時略過
+            if fut.cancelled():
+                return
+            try:
+                self.after(0, on_done, fut)
+            except (RuntimeError, tk.TclError):
+                pass
+
+        fut = self._executor.submit(worker)
+        fut.add_done_callback(post_done)
 
     def disable_ui(self) -> None:
-        for child in self.winfo_children():
-            # 僅對支援 state 選項的元件進行啟用/停用
-            try:
-                if "state" in child.keys():
-                    child.configure(state="disabled")
-            except Exception:
-                # 某些自訂或特殊元件可能不支援 keys()/configure，略過即可
-                continue
+        for w in self._stateful:
+            w.state(["disabled"])
 
     def enable_ui(self) -> None:
-        for child in self.winfo_children():
-            try:
-                if "state" in child.keys():
-                    child.configure(state="normal")
-            except Exception:
-                continue
+        for w in self._stateful:
+            w.state(["!disabled"])
 
 
 if __name__ == "__main__":
@@ -1,23 +1,355 @@
-import mcubes
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
 import torch
 import numpy as np
 
+# CPU 路徑優先使用 scikit-image 的 Lewiner marching cubes（Cython 實作），
+# 無法匯入時才退回 PyMCubes
+try:
+    from skimage.measure import marching_cubes as _sk_marching_cubes
+except ImportError:
+    _sk_marching_cubes = None
+try:
+    import mcubes
+except ImportError:
+    mcubes = None
+
+# 立方體 8 個角點相對於立方體原點的座標 (x, y, z)
+_CORNERS = (
+    (0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0),
+    (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1),
+)
+# 立方體 12 條邊，每條邊由較小座標的角點指向沿某一軸 +1 的角點
+_EDGES = (
+    (0, 1), (3, 2), (4, 5), (7, 6),  # 沿 x 軸
+    (0, 3), (1, 2), (4, 7), (5, 6),  # 沿 y 軸
+    (0, 4), (1, 5), (2, 6), (3, 7),  # 沿 z 軸
+)
+
+# 依裝置快取的三角形查表，首次在該裝置上使用時建立
+_TRI_TABLES: dict = {}
+
+# grid 元素數超過此值才在 CPU 上分塊平行運算，較小的 grid 建立行程的成本反而較高
+_PARALLEL_MIN_SIZE = 64 ** 3
+# 平行運算時供子行程讀取的 grid；以 fork 建立的子行程會直接繼承，不需序列化複製
+_SLAB_GRID: Optional[np.ndarray] = None
+# slab 交界層上的等值面交點與該層格點的最小距離（格距為 1）；
+# 距離夠遠時交界頂點的座標可唯一對應回所在格邊，不受兩側插值的捨入誤差影響
+_SEAM_MIN_T = 1e-3
+
+# GPU -> CPU 複製用的鎖頁記憶體暫存區，grid 形狀或型別改變時才重新配置
+_STAGE: Optional[torch.Tensor] = None
+
+
+def _build_tri_table() -> list[list[tuple[int, int, int]]]:
+    """產生 256 種角點內外組合對應的三角形（以邊索引表示）。
+
+    在立方體每個面上沿外法線逆時針走訪，把每段「內側」角點以一條線段切開；
+    面上出現對角歧義時一律分開內側角點。相鄰立方體共用的面會得到相同線段，
+    因此產生的網格不會有破洞。線段串成封閉迴圈後再以扇形切成三角形。
+    """
+    edge_of = {frozenset(e): i for i, e in enumerate(_EDGES)}
+    faces = []
+    for axis in range(3):
+        for side in (0, 1):
+            ids = [i for i, c in enumerate(_CORNERS) if c[axis] == side]
+            u, v = [a for a in range(3) if a != axis]
+            # 以面中心為原點依角度排序，再依外法線方向決定走訪方向
+            ids.sort(key=lambda i: np.arctan2(_CORNERS[i][v] - 0.5, _CORNERS[i][u] - 0.5))
+            p0, p1, p2 = (np.array(_CORNERS[i]) for i in ids[:3])
+            normal = np.zeros(3)
+            normal[axis] = 1 if side else -1
+            if np.dot(np.cross(p1 - p0, p2 - p1), normal) < 0:
+                ids.reverse()
+            faces.append(ids)
+
+    table = []
+    for case in range(256):
+        inside = [(case >> i) & 1 for i in range(8)]
+        nxt = {}
+        for ids in faces:
+            events = []
+            for k in range(4):
+                a, b = ids[k], ids[(k + 1) % 4]
+                if inside[a] != inside[b]:
+                    events.append((inside[b], edge_of[frozenset((a, b))]))
+            # 每個進入點與其後第一個離開點之間是一段內側角點
+            for k, (entering, edge) in enumerate(events):
+                if entering:
+                    nxt[edge] = events[(k + 1) % len(events)][1]
+
+        tris = []
+        while nxt:
+            start = next(iter(nxt))
+            loop = [start]
+            while nxt[loop[-1]] != start:
+                loop.append(nxt.pop(loop[-1]))
+            nxt.pop(loop[-1])
+            tris.extend((loop[0], loop[i], loop[i + 1]) for i in range(1, len(loop) - 1))
+        table.append(tris)
+    return table
+
+
+def _tri_table(device: torch.device) -> torch.Tensor:
+    """取得指定裝置上的查表張量，形狀為 (256, 最大三角形數, 3)，不足處填 -1。"""
+    table = _TRI_TABLES.get(device)
+    if table is None:
+        rows = _build_tri_table()
+        width = max(len(r) for r in rows)
+        padded = [r + [(-1, -1, -1)] * (width - len(r)) for r in rows]
+        table = torch.tensor(padded, dtype=torch.int64, device=device)
+        _TRI_TABLES[device] = table
+    return table
+
+
+def _marching_cubes_torch(grid: torch.Tensor, thresh: float):
+    """以向量化的 torch 運算在 grid 所在裝置上執行 marching cubes。
+
+    第一階段逐立方體計算角點組合並挑出跨越等值面的立方體；第二階段查表產生三角形，
+    並以「格點邊」的全域編號去除重複頂點後內插座標。資料全程留在原裝置上，不需往返 CPU。
+    """
+    device = grid.device
+    nx, ny, nz = grid.shape
+    inside = grid > thresh
+
+    # 第一階段：8 個角點的內外狀態組成 0~255 的立方體索引
+    cube = torch.zeros((nx - 1, ny - 1, nz - 1), dtype=torch.uint8, device=device)
+    for bit, (dx, dy, dz) in enumerate(_CORNERS):
+        corner = inside[dx:nx - 1 + dx, dy:ny - 1 + dy, dz:nz - 1 + dz]
+        cube |= corner.to(torch.uint8) << bit
+    del inside
+
+    active = ((cube != 0) & (cube != 255)).nonzero()
+    if active.shape[0] == 0:
+        return (
+            torch.zeros((0, 3), dtype=torch.float32, device=device),
+            torch.zeros((0, 3), dtype=torch.int64, device=device),
+        )
+    cases = cube[active[:, 0], active[:, 1], active[:, 2]].long()
+    del cube
+
+    # 第二階段：查表取得每個立方體的三角形（邊索引），濾掉填充值
+    tris = _tri_table(device)[cases]
+    valid = tris[:, :, 0] >= 0
+    cube_of_tri = active.unsqueeze(1).expand(-1, tris.shape[1], -1)[valid]
+    tri_edges = tris[valid]
+
+    # 立方體的邊轉為整個格點上的邊：起點格點座標 * 3 + 軸向
+    edge_base = torch.tensor(
+        [_CORNERS[a] for a, _ in _EDGES], dtype=torch.int64, device=device
+    )
+    edge_axis = torch.arange(12, device=device) // 4
+    base = cube_of_tri.unsqueeze(1) + edge_base[tri_edges]
+    edge_ids = ((base[..., 0] * ny + base[..., 1]) * nz + base[..., 2]) * 3 + edge_axis[tri_edges]
+
+    uniq, faces = torch.unique(edge_ids.reshape(-1), return_inverse=True)
+    faces = faces.reshape(-1, 3)
+
+    # 在每條跨越等值面的格點邊上線性內插頂點位置
+    axis = uniq % 3
+    point = uniq // 3
+    x = point // (ny * nz)
+    y = (point // nz) % ny
+    z = point % nz
+    p0 = torch.stack((x, y, z), dim=1)
+    p1 = p0 + torch.nn.functional.one_hot(axis, 3)
+    v0 = grid[p0[:, 0], p0[:, 1], p0[:, 2]].float()
+    v1 = grid[p1[:, 0], p1[:, 1], p1[:, 2]].float()
+    t = ((thresh - v0) / (v1 - v0)).unsqueeze(1)
+    verts = p0.float() + t * (p1 - p0).float()
+
+    return verts, faces
+
+
+def _to_numpy(grid: torch.Tensor) -> np.ndarray:
+    """將 grid 轉為 CPU numpy array；CUDA 張量經由重複使用的鎖頁記憶體暫存區複製。"""
+    global _STAGE
+    if not grid.is_cuda:
+        return grid.cpu().numpy()
+    # 鎖頁 (pinned) 記憶體可讓 DMA 直接傳輸，並避免每次重新配置與鎖定記憶體
+    if _STAGE is None or _STAGE.shape != grid.shape or _STAGE.dtype != grid.dtype:
+        _STAGE = torch.empty(grid.shape, dtype=grid.dtype, pin_memory=True)
+    _STAGE.copy_(grid, non_blocking=True)
+    torch.cuda.current_stream(grid.device).synchronize()
+    return _STAGE.numpy()
+
+
+def _marching_cubes_cpu(grid: np.ndarray, thresh: float):
+    """在 CPU 上執行 marching cubes，回傳 numpy 的 (verts, faces)。"""
+    if _sk_marching_cubes is not None:
+        # scikit-image 在等值不落於資料範圍內、或範圍內但沒有任何格邊穿越等值時會拋出例外，
+        # PyMCubes 則回傳空網格，這裡維持後者行為（平行運算時個別 slab 也可能沒有曲面）
+        empty = np.zeros((0, 3), dtype=np.float32), np.zeros((0, 3), dtype=np.int64)
+        if not grid.min() <= thresh <= grid.max():
+            return empty
+        try:
+            # gradient_direction="ascent" 讓三角形繞向與 PyMCubes / torchmcubes 一致
+            verts, faces, _, _ = _sk_marching_cubes(
+                grid,
+                level=thresh,
+                method="lewiner",
+                allow_degenerate=False,
+                gradient_direction="ascent",
+            )
+        except RuntimeError as e:
+            if "No surface found" not in str(e):
+                raise
+            return empty
+        return verts, faces
+
+    # 兩者皆未安裝時明確報錯；若任由 None 引發 AttributeError，
+    # TripoSR 會誤判為「torchmcubes 未以 CUDA 編譯」而掩蓋真正原因
+    if mcubes is None:
+        raise ImportError(
+            "CPU marching cubes requires scikit-image or PyMCubes; "
+            "install one of them (pip install scikit-image)."
+        )
+
+    # 呼叫 PyMCubes 進行運算
+    # PyMCubes 回傳的是 (verts, faces)
+    verts, faces = mcubes.marching_cubes(grid, thresh)
+    # PyMCubes 的 faces 為 uint64，索引值不會超出 int64 範圍，可直接重新解讀而不複製
+    if faces.dtype == np.uint64:
+        faces = faces.view(np.int64)
+    return verts, faces
+
+
+def _mc_slab(args: tuple[int, int, float]):
+    """子行程：對第 z0~z1 層的 grid（沿第 0 軸）執行 marching cubes，頂點座標換回整個 grid。"""
+    z0, z1, thresh = args
+    verts, faces = _marching_cubes_cpu(_SLAB_GRID[z0:z1 + 1], thresh)
+    verts[:, 0] += z0
+    return verts, faces
+
+
+def _is_clean_seam(grid: np.ndarray, z: int, thresh: float) -> bool:
+    """第 z 層（沿第 0 軸）適合作為 slab 交界：所有與等值面相交的格邊，交點都不貼近本層的格點。"""
+    a = grid[z].astype(np.float64) - thresh
+    # 格點值恰為等值時各實作對「是否相交」的判定不一，頂點會直接落在格點上
+    if not a.all():
+        return False
+    # 層內沿第 1、2 軸的邊：交點離兩端都要夠遠，才能由座標判斷是哪一條邊
+    for u, v in ((a[:-1], a[1:]), (a[:, :-1], a[:, 1:])):
+        cross = (u > 0) != (v > 0)
+        t = u[cross] / (u[cross] - v[cross])
+        if t.size and np.minimum(t, 1 - t).min() < _SEAM_MIN_T:
+            return False
+    # 穿過本層的第 0 軸邊：交點不可貼近本層，否則頂點座標可能被捨入成落在本層上
+    for z2 in (z - 1, z + 1):
+        b = grid[z2].astype(np.float64) - thresh
+        cross = (a > 0) != (b > 0)
+        t = a[cross] / (a[cross] - b[cross])
+        if t.size and t.min() < _SEAM_MIN_T:
+            return False
+    return True
+
+
+def _seam_planes(grid: np.ndarray, thresh: float, n_workers: int) -> list[int]:
+    """挑選 slab 交界層：在各等分位置附近找最近的合格層，找不到時該處就不切開。"""
+    n = grid.shape[0]
+    step = (n - 1) / n_workers
+    reach = max(1, int(step) // 2)
+    planes: list[int] = []
+    for k in range(1, n_workers):
+        s = round(k * step)
+        for d in sorted(range(-reach, reach + 1), key=abs):
+            z = s + d
+            if (planes[-1] if planes else 0) < z < n - 1 and _is_clean_seam(grid, z, thresh):
+                planes.append(z)
+                break
+    return planes
+
+
+def _mc_parallel(grid: np.ndarray, thresh: float, n_workers: int):
+    """沿第 0 軸把 grid 切成相鄰 slab（彼此共用一層格點）平行運算後再接合。
+
+    相鄰 slab 在共用層上會各自為同一條格邊產生頂點，接合時依格邊合併，拓撲與一次算完相同。
+    """
+    global _SLAB_GRID
+    planes = _seam_planes(grid, thresh, n_workers)
+    if not planes:
+        return _marching_cubes_cpu(grid, thresh)
+    bounds = list(zip([0] + planes, planes + [grid.shape[0] - 1]))
+
+    _SLAB_GRID = grid
+    try:
+        ctx = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=len(bounds), mp_context=ctx) as pool:
+            parts = list(pool.map(_mc_slab, [(z0, z1, thresh) for z0, z1 in bounds]))
+    finally:
+        _SLAB_GRID = None
+
+    offsets = np.cumsum([0] + [len(v) for v, _ in parts[:-1]])
+    verts = np.concatenate([v for v, _ in parts])
+    faces = np.concatenate([f.astype(np.int64, copy=False) + o for (_, f), o in zip(parts, offsets)])
+
+    # 合併交界層上的重複頂點，並移除合併後不再被引用的頂點。
+    # 交界層經 _is_clean_seam 篩選，落在層上的頂點必定位於層內某條格邊上且明確離開格點：
+    # 非邊方向的座標為整數，邊方向的座標取 floor 即為邊的起點。
+    # 與 _marching_cubes_torch 相同，以（層、邊的方向、起點）作為格邊的唯一編號來合併，不比對浮點座標
+    on_plane = np.flatnonzero(np.isin(verts[:, 0], np.array(planes, dtype=verts.dtype)))
+    if on_plane.size:
+        p = verts[on_plane].astype(np.float64)
+        along_1 = np.abs(p[:, 1] - np.rint(p[:, 1])) > np.abs(p[:, 2] - np.rint(p[:, 2]))
+        edge_key = np.empty((len(p), 4), dtype=np.int64)
+        edge_key[:, 0] = p[:, 0]
+        edge_key[:, 1] = along_1
+        edge_key[:, 2] = np.where(along_1, np.floor(p[:, 1]), np.rint(p[:, 1]))
+        edge_key[:, 3] = np.where(along_1, np.rint(p[:, 2]), np.floor(p[:, 2]))
+        _, first, inverse = np.unique(edge_key, axis=0, return_index=True, return_inverse=True)
+        remap = np.arange(len(verts))
+        remap[on_plane] = on_plane[first][inverse.reshape(-1)]
+        faces = remap[faces]
+        keep = np.zeros(len(verts), dtype=bool)
+        keep[faces] = True
+        verts = verts[keep]
+        faces = (np.cumsum(keep) - 1)[faces]
+    return verts, faces
+
+
 def marching_cubes(grid, thresh):
     """
     這是一個相容性 Wrapper，用於替代原本的 torchmcubes.marching_cubes。
-    它內部使用 PyMCubes (CPU) 來執行運算，避免 Windows 下的 DLL 載入錯誤。
+    grid 位於 CUDA 時直接在 GPU 上以 torch 運算執行，結果留在 GPU；
+    其餘情況（或 GPU 記憶體不足時）在 CPU 上以 scikit-image 或 PyMCubes 執行，避免 Windows 下的 DLL 載入錯誤。
     """
+    if isinstance(grid, torch.Tensor) and grid.is_cuda:
+        try:
+            return _marching_cubes_torch(grid.detach(), thresh)
+        except torch.cuda.OutOfMemoryError:
+            # GPU 記憶體不足時釋放快取並改走 CPU 路徑
+            torch.cuda.empty_cache()
+
     # 如果 grid 是 Tensor，先轉回 CPU numpy array
+    # （CUDA 張量會得到鎖頁暫存區 _STAGE 的 view，不可交給 fork 出的子行程讀取）
+    staged = isinstance(grid, torch.Tensor) and grid.is_cuda
     if isinstance(grid, torch.Tensor):
-        grid = grid.detach().cpu().numpy()
-    
-    # 呼叫 PyMCubes 進行運算
-    # PyMCubes 回傳的是 (verts, faces)
-    verts, faces = mcubes.marching_cubes(grid, thresh)
-    
-    # 將結果轉回 PyTorch Tensor，並轉為正確的型別
+        grid = _to_numpy(grid.detach())
+
+    # 大型 grid 在可使用 fork 的平台（Linux/macOS）上分塊平行運算。
+    # 本專案主要目標的 Windows 只能以 spawn 建立行程，子行程會重新執行 TripoSR 的 run.py，
+    # 因此在 Windows 上永遠維持單一行程。
+    # 注意 fork 時父行程已載入 torch（可能有多個執行緒在跑），子行程只使用 numpy 與
+    # scikit-image / PyMCubes，不可在其中呼叫 torch，以免碰到 fork 前被其他執行緒持有的鎖。
+    # 來自 GPU 的 grid（OOM 退回 CPU）也維持單一行程：此時 CUDA 已初始化，
+    # 且 grid 位於鎖頁記憶體，CUDA 不保證 fork 出的子行程能正常使用這些資源
+    n_workers = os.cpu_count() or 1
+    if (
+        not staged
+        and grid.size > _PARALLEL_MIN_SIZE
+        and n_workers > 1
+        and "fork" in multiprocessing.get_all_start_methods()
+    ):
+        verts, faces = _mc_parallel(grid, thresh, n_workers)
+    else:
+        verts, faces = _marching_cubes_cpu(grid, thresh)
+
+    # 將結果轉回 PyTorch Tensor，並轉為正確的型別（型別已相符時不另外複製）
     # TripoSR 預期 verts 是 FloatTensor, faces 是 LongTensor
-    verts_tensor = torch.from_numpy(verts).to(dtype=torch.float32)
-    faces_tensor = torch.from_numpy(faces.astype(np.int64))
-    
+    verts_tensor = torch.from_numpy(verts.astype(np.float32, copy=False))
+    faces_tensor = torch.from_numpy(faces.astype(np.int64, copy=False))
+
     return verts_tensor, faces_tensor
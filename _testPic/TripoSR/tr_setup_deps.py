@@ -1,20 +1,50 @@
+import os
+import shutil
 import subprocess
 import sys
+import tempfile
 from pathlib import Path
+from typing import Optional
 
 # 此腳本在已啟用的 .venv 中執行，負責安裝 TripoSR 相關相依
-# - 暫時切換為 CPU 版 torch/vision/audio 以便編譯 torchmcubes
-# - 放寬 transformers 版本，確保 Python 3.12 有可用的 tokenizers 輪檔
-# - 安裝 requirements.txt 中的其餘相依
-# - 確保 gradio 存在（GUI 介面用）
-# - 最後再將 torch/vision/audio 切換回 CUDA 版，供推論使用
+# - 若專案內沒有 torchmcubes.py wrapper，暫時切換為 CPU 版 torch/vision/audio 以便編譯 torchmcubes
+# - 以單次 pip 呼叫安裝 requirements.txt 與額外套件（onnxruntime、gradio），
+#   並以 constraints 放寬 transformers 版本（確保 Python 3.12 有可用的 tokenizers 輪檔）、限制 NumPy < 2.0
+# - 最後確保 torch/vision/audio 為 CUDA 版，供推論使用（有 wrapper 時只在尚未安裝 CUDA 版時安裝一次）
 
 PROJECT_DIR = Path(__file__).resolve().parent
 TRIPOSR_DIR = PROJECT_DIR / "vendor" / "TripoSR"
 REQ_FILE = TRIPOSR_DIR / "requirements.txt"
+# 本地的 torchmcubes 相容 wrapper；存在時不需要編譯原生的 torchmcubes
+MCUBES_WRAPPER = PROJECT_DIR / "torchmcubes.py"
+
+# 與 requirements.txt 一同解析的版本限制（寫入暫存的 constraints 檔）
+# - NumPy 需維持 1.x 以相容 trimesh
+PIN_CONSTRAINTS = ("numpy<2.0", "transformers>=4.39.0", "tokenizers>=0.15.0")
+# requirements.txt 之外需要的套件：rembg 的推論 backend、GUI 用的 gradio，
+# 以及 torchmcubes.py wrapper 在 CPU 上使用的 marching cubes（scikit-image）
+EXTRA_PACKAGES = ("onnxruntime", "gradio", "scikit-image")
+# 這些套件在各平台皆有輪檔，一律不從原始碼編譯（例如 tokenizers 需要 Rust/Cargo）；
+# 其餘套件只以 --prefer-binary 優先選用輪檔，因 requirements.txt 中仍可能有需要編譯的項目
+BINARY_ONLY = ("transformers", "tokenizers", "onnxruntime", "gradio")
+
+# 可用時以 uv 取代 pip 安裝（並行下載與解析，速度快很多）；找不到時為 None
+UV_EXE = shutil.which("uv")
+PIP_INSTALL = [sys.executable, "-m", "pip", "install"]
+# uv 不支援的 pip 參數（uv 本身就會優先選用輪檔）
+UV_UNSUPPORTED = frozenset({"--prefer-binary"})
 
 def run(cmd: list[str]) -> int:
-    """以目前 Python 進程執行子命令，直接轉印輸出。"""
+    """以目前 Python 進程執行子命令，直接轉印輸出。
+
+    若為 pip install 且系統上有 uv，改以 uv pip install 安裝到同一個 Python；uv 失敗時再退回 pip。
+    """
+    if UV_EXE and cmd[:4] == PIP_INSTALL:
+        args = [a for a in cmd[4:] if a not in UV_UNSUPPORTED]
+        rc = subprocess.call([UV_EXE, "pip", "install", "--python", sys.executable, *args])
+        if rc == 0:
+            return rc
+        print("[WARN] uv pip install failed; retrying with pip.")
     return subprocess.call(cmd)
 
 def patch_requirements() -> None:
@@ -23,6 +53,7 @@ def patch_requirements() -> None:
     目前主要處理：
     - 若存在 transformers==4.35.0，改為 transformers>=4.39.0，
       以避免拉到需要 Rust/Cargo 的舊 tokenizers 版本。
+    - 若本地已有 torchmcubes.py wrapper，移除 torchmcubes 這一行，避免從原始碼編譯。
     """
     if not REQ_FILE.exists():
         return
@@ -35,16 +66,54 @@ def patch_requirements() -> None:
 
     original = text
     text = text.replace("transformers==4.35.0", "transformers>=4.39.0")
+    if MCUBES_WRAPPER.exists():
+        text = "".join(
+            line for line in text.splitlines(keepends=True) if "torchmcubes" not in line
+        )
 
     if text != original:
         try:
             REQ_FILE.write_text(text, encoding="utf-8")
-            print("[INFO] Patched requirements.txt to use transformers>=4.39.0 instead of 4.35.0.")
+            print("[INFO] Patched requirements.txt (transformers pin / torchmcubes build).")
         except Exception:
             # 寫入失敗時也不終止流程，只是保留原設定
             print("[WARN] Failed to patch requirements.txt; using upstream transformers pin.")
 
 
+def torch_cuda_build() -> Optional[bool]:
+    """回傳目前環境的 torch 是否為 CUDA 版；尚未安裝（或無法匯入）時回傳 None。
+
+    以子行程查詢，避免本行程載入 torch 後（Windows 上 DLL 被鎖住）無法再重新安裝。
+    """
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-c", "import torch; print(torch.version.cuda or '')"],
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return None
+    if proc.returncode != 0:
+        return None
+    return bool(proc.stdout.strip())
+
+
+def install_cuda_torch(*pip_args: str) -> int:
+    """從 cu121 索引安裝 torch/vision/audio。"""
+    return run([
+        sys.executable,
+        "-m",
+        "pip",
+        "install",
+        *pip_args,
+        "torch",
+        "torchvision",
+        "torchaudio",
+        "--index-url",
+        "https://download.pytorch.org/whl/cu121",
+    ])
+
+
 def main() -> int:
     if not REQ_FILE.exists():
         print(f"[ERROR] requirements.txt not found at {REQ_FILE}")
@@ -53,14 +122,13 @@ def main() -> int:
     # 先修正上游 requirements 中已知會造成安裝問題的版本限制
     patch_requirements()
 
-    # 若目前環境已可匯入 torchmcubes，則跳過之後昂貴的 torch 重安裝步驟
-    skip_torch_reinstall = False
-    try:
-        import torchmcubes  # type: ignore
-        skip_torch_reinstall = True
-        print("[INFO] torchmcubes already importable; skipping torch CPU/CUDA reinstall steps.")
-    except Exception:
-        print("[INFO] torchmcubes not importable yet; will run torch CPU/CUDA reinstall and build steps.")
+    # CPU 版 torch 只是為了編譯 torchmcubes；本地已有 wrapper 時跳過 CPU 版安裝，
+    # 最後只需安裝一次 CUDA 版（省下一輪約 2GB 的輪檔下載與強制重裝）
+    skip_torch_reinstall = MCUBES_WRAPPER.exists()
+    if skip_torch_reinstall:
+        print("[INFO] torchmcubes.py wrapper found; skipping CPU torch install and CPU/CUDA swap.")
+    else:
+        print("[INFO] torchmcubes.py wrapper not found; will run torch CPU/CUDA reinstall and build steps.")
 
     if not skip_torch_reinstall:
         # 先安裝 CPU 版 torch/vision/audio，避免 torchmcubes 受到 CUDA 版 torch 影響
@@ -83,72 +151,58 @@ def main() -> int:
             print("[ERROR] Failed to install CPU build of torch/vision/audio.")
             return rc
 
-    # 安裝相容於 Python 3.12 的 transformers/tokenizers
-    print("[INFO] Installing compatible transformers/tokenizers for Python 3.12...")
-    rc = run([sys.executable, "-m", "pip", "install", "transformers>=4.39.0", "tokenizers>=0.15.0"])
-    if rc != 0:
-        print("[WARN] Failed to pre-install transformers/tokenizers; continuing anyway.")
-
-    # 安裝 TripoSR 其餘 requirements
-    print("[INFO] Installing requirements from requirements.txt...")
-    rc = run([sys.executable, "-m", "pip", "install", "-r", str(REQ_FILE)])
-    if rc != 0:
-        print("[ERROR] Failed to install TripoSR dependencies from requirements.txt.")
-        return rc
-
+    # 一次安裝 requirements.txt 與額外套件，讓 pip 只啟動與解析相依一次
+    print("[INFO] Installing TripoSR requirements, onnxruntime and gradio...")
+    fd, constraints = tempfile.mkstemp(prefix="tr_constraints_", suffix=".txt", text=True)
     try:
-        import torchmcubes  # type: ignore
-        print("[INFO] torchmcubes import successful after installation.")
-    except Exception:
-        print("[WARN] torchmcubes import failed after installation; fallback implementation may be used.")
-
-    # rembg 需要 onnxruntime 作為推論 backend
-    print("[INFO] Ensuring onnxruntime is installed for rembg...")
-    rc = run([sys.executable, "-m", "pip", "install", "onnxruntime"])
-    if rc != 0:
-        print("[WARN] Failed to install onnxruntime; rembg may not work correctly.")
-
-    # 確保 gradio 安裝完成
-    print("[INFO] Ensuring gradio is installed...")
-    rc = run([sys.executable, "-m", "pip", "install", "gradio"])
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(PIN_CONSTRAINTS) + "\n")
+        rc = run([
+            sys.executable,
+            "-m",
+            "pip",
+            "install",
+            "--prefer-binary",
+            "--only-binary",
+            ",".join(BINARY_ONLY),
+            "-r",
+            str(REQ_FILE),
+            "--constraint",
+            constraints,
+            *EXTRA_PACKAGES,
+        ])
+    finally:
+        os.unlink(constraints)
     if rc != 0:
-        print("[ERROR] Failed to install gradio.")
+        print("[ERROR] Failed to install TripoSR dependencies.")
         return rc
 
+    if not skip_torch_reinstall:
+        try:
+            import torchmcubes  # type: ignore
+            print("[INFO] torchmcubes import successful after installation.")
+        except Exception:
+            print("[WARN] torchmcubes import failed after installation; fallback implementation may be used.")
+
     # 最後將 torch/vision/audio 切回 CUDA 版，供推論使用
     # 同樣使用 --force-reinstall 與 --no-deps，確保最終為 CUDA 版。
     if not skip_torch_reinstall:
         print("[INFO] Re-installing CUDA (cu121) build of torch/vision/audio for GPU inference (force reinstall)...")
-        rc = run([
-            sys.executable,
-            "-m",
-            "pip",
-            "install",
-            "--force-reinstall",
-            "--no-deps",
-            "torch",
-            "torchvision",
-            "torchaudio",
-            "--index-url",
-            "https://download.pytorch.org/whl/cu121",
-        ])
+        rc = install_cuda_torch("--force-reinstall", "--no-deps")
         if rc != 0:
             print("[WARN] Failed to install CUDA build of torch/vision/audio. CPU build will be used.")
-
-    # 最後一步：強制安裝與 trimesh 相容的 NumPy 版本，避免被其他套件升級到 2.x
-    print("[INFO] Force-reinstalling NumPy (<2.0) for trimesh compatibility (no deps)...")
-    rc = run([
-        sys.executable,
-        "-m",
-        "pip",
-        "install",
-        "--force-reinstall",
-        "--no-deps",
-        "numpy<2.0",
-    ])
-    if rc != 0:
-        print("[ERROR] Failed to force-reinstall compatible NumPy (<2.0).")
-        return rc
+    else:
+        # 有 wrapper 時仍需要 torch 本身：已是 CUDA 版就略過；已有 CPU 版時強制覆蓋（其餘相依已存在）；
+        # 尚未安裝時一般安裝即可，連同 torch 的相依一起裝上
+        cuda_build = torch_cuda_build()
+        if cuda_build:
+            print("[INFO] CUDA build of torch already installed; skipping torch install.")
+        else:
+            print("[INFO] Installing CUDA (cu121) build of torch/vision/audio for GPU inference...")
+            rc = install_cuda_torch(*(("--force-reinstall", "--no-deps") if cuda_build is False else ()))
+            if rc != 0:
+                print("[ERROR] Failed to install CUDA build of torch/vision/audio.")
+                return rc
 
     print("[INFO] Dependency setup completed by tr_setup_deps.py")
     return 0